@@ -5,30 +5,79 @@ Captures pages directly from the VitalSource Bookshelf desktop application.
 - Press 'q' to stop at any time
 """
 
+import io
 import os
 import sys
+import json
 import time
+import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from pathlib import Path
-from PIL import Image, ImageGrab
+from PIL import Image, ImageChops, ImageGrab
 import pyautogui
 from fpdf import FPDF
 import keyboard
 
+try:
+    import dxcam  # Optional: DXGI Desktop Duplication capture (Windows only)
+except ImportError:
+    dxcam = None
+
 # --- Configuration ---
 SCRIPT_DIR = Path(__file__).resolve().parent
 TEMP_IMAGE_DIR = SCRIPT_DIR / "temp_book_pages"
+MANIFEST_PATH = TEMP_IMAGE_DIR / "manifest.json"  # known-good pages for resuming
+
+# Margins removed around the book content: left sidebar, top bar, right margin, bottom bar
+CROP_LEFT, CROP_TOP, CROP_RIGHT, CROP_BOTTOM = 280, 80, 50, 50
+# JPEG quality for page images (lossless mode stores PNG instead)
+JPEG_QUALITY = 85
+# Page file extensions picked up on resume, whichever mode wrote them
+PAGE_EXTS = (".jpg", ".png")
+# zlib level for lossless PNG pages: 1 is ~5x faster than the default 6
+PNG_COMPRESS_LEVEL = 1
+# File markers used to check that a page image was written completely
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOI = b"\xff\xd8\xff"
+JPEG_EOI = b"\xff\xd9"
+# With no page count, stop once this many consecutive captures are identical (end of book)
+END_OF_BOOK_REPEATS = 3
+# Save the manifest every N written pages so a crash loses little
+MANIFEST_SAVE_EVERY = 50
+# Max pages buffered between capture, encode and write stages
+PIPELINE_QUEUE_SIZE = 4
+# How often the UI drains queued log lines / progress, and max lines per drain
+LOG_DRAIN_MS = 100
+LOG_DRAIN_BATCH = 50
 
 # Disable pyautogui failsafe (move mouse to corner to abort)
 pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
+pyautogui.PAUSE = 0  # No implicit sleep after each call; delay_ms already lets the page render
 
 
 class GlobalState:
     relative_offset = None  # (offset_x, offset_y) from window top-left
     paused = False
+    camera = None  # Persistent DXcam camera, None when falling back to ImageGrab
+    last_frame = None  # (region, image) of the last DXcam grab, reused while the screen is unchanged
+    crop_key = None  # (window rect, crop_margins) that crop_bbox was computed for
+    crop_bbox = None  # Absolute screen bbox of the book content
+
+
+def create_camera():
+    """Create a DXcam camera for the primary output, or None if unavailable."""
+    if dxcam is None:
+        return None
+    try:
+        return dxcam.create(output_idx=0, output_color="RGB")
+    except Exception:
+        return None
+
+
+GlobalState.camera = create_camera()
 
 
 def find_vitalsource_window():
@@ -48,45 +97,120 @@ def find_vitalsource_window():
     return None
 
 
-def capture_window(window, path, crop_margins=True):
-    """Capture a screenshot of the specified window."""
+def window_rect(window):
+    """Read (left, top, width, height) of the window once. Returns None if the handle is stale."""
     try:
-        # Get window position and size
-        left, top, width, height = window.left, window.top, window.width, window.height
-        
-        # Capture the window area
-        screenshot = ImageGrab.grab(bbox=(left, top, left + width, top + height))
-        
-        if crop_margins:
-            # Crop to get just the book content (center area)
-            w, h = screenshot.size
-            # Remove: left sidebar (~280px), top bar (~80px), bottom bar (~50px), right margin (~50px)
-            left_crop = 280
-            top_crop = 80
-            right_crop = w - 50
-            bottom_crop = h - 50
-            
-            # Make sure crop is valid
-            if right_crop > left_crop and bottom_crop > top_crop:
-                screenshot = screenshot.crop((left_crop, top_crop, right_crop, bottom_crop))
+        return window.left, window.top, window.width, window.height
+    except Exception:
+        return None
+
+
+def grab_dxcam(region):
+    """Grab a screen region with DXcam. Returns a PIL image, or None on failure."""
+    try:
+        frame = GlobalState.camera.grab(region=region)
+    except Exception:
+        return None  # e.g. region lies outside the duplicated output
+    if frame is None:
+        # DXcam returns None when the screen has not changed since the last grab,
+        # so the previous frame of the same region is still current
+        last = GlobalState.last_frame
+        return last[1] if last is not None and last[0] == region else None
+    image = Image.fromarray(frame)
+    GlobalState.last_frame = (region, image)
+    return image
+
+
+def content_bbox(rect, crop_margins=True):
+    """Absolute screen bbox to capture for a window rect.
+
+    Recomputed only when the window moves or resizes, so the per-page path
+    is a single tuple comparison.
+    """
+    key = (rect, crop_margins)
+    if key != GlobalState.crop_key:
+        left, top, width, height = rect
+        bbox = (left, top, left + width, top + height)
+        # Remove sidebars and toolbars, if the window is big enough to crop
+        if crop_margins and width - CROP_RIGHT > CROP_LEFT and height - CROP_BOTTOM > CROP_TOP:
+            bbox = (left + CROP_LEFT, top + CROP_TOP, left + width - CROP_RIGHT, top + height - CROP_BOTTOM)
+        GlobalState.crop_key, GlobalState.crop_bbox = key, bbox
+    return GlobalState.crop_bbox
+
+
+def capture_window(rect, crop_margins=True):
+    """Capture a screenshot of the window at rect. Returns the image, or None on failure."""
+    try:
+        bbox = content_bbox(rect, crop_margins)
         
-        screenshot.save(str(path), optimize=True)
-        return True
+        screenshot = None
+        if GlobalState.camera is not None:
+            screenshot = grab_dxcam(bbox)
+        
+        if screenshot is None:
+            # Fall back to GDI capture of just the content, no post-grab crop
+            screenshot = ImageGrab.grab(bbox=bbox)
+        
+        return screenshot
     except Exception as e:
         print(f"Capture error: {e}")
+        return None
+
+
+def page_hash(image):
+    """64-bit difference hash (dHash) of a page, a cheap pre-filter for repeated captures."""
+    small = image.resize((9, 8), Image.BILINEAR).convert("L")
+    px = small.load()
+    return bytes(1 if px[x + 1, y] > px[x, y] else 0 for y in range(8) for x in range(8))
+
+
+def same_pixels(a, b):
+    """True if two captures are pixel-for-pixel identical."""
+    if a.size != b.size or a.mode != b.mode:
+        return False
+    return ImageChops.difference(a, b).getbbox() is None
+
+
+def encode_page(image, lossless=False, compress_level=PNG_COMPRESS_LEVEL, scale=1.0):
+    """Encode a captured page as JPEG (or PNG in lossless mode). Returns a BytesIO.
+
+    With scale < 1.0 the image is downscaled first; encode cost and output
+    size shrink with the pixel count.
+    """
+    if scale != 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    buf = io.BytesIO()
+    if lossless:
+        # No optimize pass: it retries every filter strategy and is much slower
+        image.save(buf, format="PNG", compress_level=compress_level)
+    else:
+        # fpdf2 embeds JPEG data as-is (DCTDecode), no Flate re-compression
+        image.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=False, progressive=False)
+    buf.seek(0)
+    return buf
+
+
+def save_page(data, path):
+    """Write an encoded page to disk for resuming."""
+    try:
+        path.write_bytes(data.getvalue())
+        return True
+    except Exception as e:
+        print(f"Save error: {e}")
         return False
 
 
-def click_next_page(window):
-    """Click the user-defined next page coordinates."""
+def click_next_page(rect):
+    """Click the user-defined next page coordinates relative to the window rect."""
     if GlobalState.paused:
         print("Paused...")
         return False
         
-    if GlobalState.relative_offset and window:
+    if GlobalState.relative_offset and rect:
         try:
-            abs_x = window.left + GlobalState.relative_offset[0]
-            abs_y = window.top + GlobalState.relative_offset[1]
+            abs_x = rect[0] + GlobalState.relative_offset[0]
+            abs_y = rect[1] + GlobalState.relative_offset[1]
             pyautogui.click(abs_x, abs_y)
             return True
         except Exception:
@@ -94,39 +218,198 @@ def click_next_page(window):
     return False
 
 
-def is_valid_image(path):
-    """Check if an image file is valid."""
+def is_valid_image(path, strict=False):
+    """Check that a page file was written completely (signature + end marker).
+
+    Only the first and last bytes are read. Pass strict=True to also run
+    Pillow's full verify(), which decodes the whole file. path may be an
+    os.DirEntry, whose cached stat is reused instead of stat-ing again.
+    """
     try:
-        with Image.open(path) as img:
-            img.verify()
-        return os.path.getsize(path) > 1000
+        size = path.stat().st_size if isinstance(path, os.DirEntry) else os.path.getsize(path)
+        if size <= 1000:
+            return False
+        with open(path, "rb") as f:
+            head = f.read(8)
+            f.seek(-12, os.SEEK_END)
+            tail = f.read(12)
+        if head == PNG_SIGNATURE:
+            valid = tail[4:8] == b"IEND"
+        elif head.startswith(JPEG_SOI):
+            valid = tail.endswith(JPEG_EOI)
+        else:
+            valid = False
+        if valid and strict:
+            with Image.open(os.fspath(path)) as img:
+                img.verify()
+        return valid
     except Exception:
         return False
 
 
-def create_pdf_from_images(image_files, output_pdf_path, log):
-    """Assemble images into a PDF."""
-    if not image_files:
-        log("No images found to create a PDF.")
-        return False
+def load_manifest():
+    """Load the {filename: {width, height, size, mtime}} sidecar kept next to the temp images."""
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_manifest(manifest):
+    """Write the manifest so a later resume can skip validating unchanged pages."""
+    try:
+        with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    except OSError as e:
+        print(f"Manifest write error: {e}")
+
+
+def manifest_record(st, width, height):
+    """Manifest entry for a page file: its page size plus the stat that marks it as checked.
+
+    The page size is the captured (unscaled) size, which can differ from the
+    file's pixel size when pages were downscaled.
+    """
+    return {"width": width, "height": height, "size": st.st_size, "mtime": st.st_mtime}
 
-    log(f"Assembling {len(image_files)} pages into PDF...")
+
+def check_page(entry, strict=False):
+    """Validate a page file and build its manifest record. Returns None if invalid.
+
+    The page size is taken from the file's pixels, so this is only the size
+    of last resort for pages the manifest does not know.
+    """
+    try:
+        if not is_valid_image(entry, strict=strict):
+            return None
+        with Image.open(entry.path) as img:
+            return manifest_record(entry.stat(), *img.size)
+    except Exception:
+        return None
+
+
+def load_existing_pages(manifest, strict=False):
+    """Find resumable pages as sorted (path, width, height) tuples.
+
+    Files whose size and mtime match the manifest are trusted as-is; only new
+    or changed files are validated, in parallel since the work is file I/O
+    and C code that releases the GIL. Pages of both formats are picked up so
+    toggling lossless mode between runs continues the same book. The
+    manifest is pruned to the pages kept. strict=True (the user's "full
+    check" option) fully decodes every page, manifest or not.
+    """
+    with os.scandir(TEMP_IMAGE_DIR) as it:
+        entries = [e for e in it if e.name.startswith("page_") and e.name.endswith(PAGE_EXTS)]
+    
+    checked = {}
+    changed = []
+    for entry in entries:
+        st = entry.stat()
+        record = manifest.get(entry.name)
+        if (not strict and isinstance(record, dict) and record.get("size") == st.st_size
+                and record.get("mtime") == st.st_mtime):
+            checked[entry.name] = record
+        else:
+            changed.append(entry)
+    
+    if changed:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+            for entry, record in zip(changed, ex.map(lambda e: check_page(e, strict), changed)):
+                if record is None:
+                    continue
+                # Keep the recorded captured size if the manifest had one
+                known = manifest.get(entry.name)
+                if isinstance(known, dict) and "width" in known and "height" in known:
+                    record["width"], record["height"] = known["width"], known["height"]
+                checked[entry.name] = record
+    
+    # Keep one file per page number if both formats exist
+    pages = []
+    kept = {}
+    for name, record in sorted(checked.items()):
+        path = TEMP_IMAGE_DIR / name
+        if pages and pages[-1][0].stem == path.stem:
+            continue
+        kept[name] = record
+        pages.append((path, record["width"], record["height"]))
+    
+    manifest.clear()
+    manifest.update(kept)
+    return pages
+
+
+def new_pdf():
+    """Create the PDF writer that pages are streamed into during capture."""
     pdf = FPDF(unit="pt")
     pdf.set_auto_page_break(auto=False)
     pdf.set_margins(0, 0, 0)
+    return pdf
+
 
-    for image_file in sorted(image_files):
-        with Image.open(image_file) as img:
-            width, height = img.size
-        pdf.add_page(format=(width, height))
-        pdf.image(str(image_file), 0, 0, width, height)
+def add_pdf_page(pdf, image, width, height):
+    """Append a page sized to the image and draw the image over it."""
+    pdf.add_page(format=(width, height))
+    pdf.image(image, 0, 0, width, height)
 
-    pdf.output(output_pdf_path)
-    log(f"PDF created: {output_pdf_path}")
-    return True
 
+def encode_worker(encode_q, write_q, lossless, compress_level, scale, log):
+    """Pipeline stage: encode captured images. A None item shuts the stage down.
 
-def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
+    Items are (page_num, path, image, size). Pages resumed from disk have no
+    image and are passed through as-is so they reach the writer in page order.
+    Errors are logged per page; the stage keeps consuming until the sentinel
+    so the capture loop never blocks on a full queue.
+    """
+    while True:
+        item = encode_q.get()
+        if item is None:
+            write_q.put(None)
+            return
+        try:
+            page_num, path, image, size = item
+            if image is None:
+                write_q.put((page_num, path, None, size))  # Already on disk
+                continue
+            # The page keeps the captured size; a downscaled image just has a lower DPI
+            data = encode_page(image, lossless, compress_level, scale)
+            write_q.put((page_num, path, data, image.size))
+        except Exception as e:
+            log(f"Failed to encode page {item[0]}: {e}")
+
+
+def write_worker(write_q, pdf, manifest, log):
+    """Pipeline stage: write encoded pages to disk and into the PDF.
+
+    Like encode_worker, a failing page is logged and skipped; only the None
+    sentinel ends the stage.
+    """
+    written = 0
+    while True:
+        item = write_q.get()
+        if item is None:
+            return
+        try:
+            page_num, path, data, (width, height) = item
+            if data is None:
+                # Resumed page: embed the file already on disk
+                add_pdf_page(pdf, str(path), width, height)
+                continue
+            if not save_page(data, path):
+                log(f"Failed to save page {page_num}")
+                continue
+            manifest[path.name] = manifest_record(os.stat(path), width, height)
+            written += 1
+            if written % MANIFEST_SAVE_EVERY == 0:
+                save_manifest(manifest)
+            # Embed the encoded bytes; nothing is read back from disk
+            add_pdf_page(pdf, data, width, height)
+        except Exception as e:
+            log(f"Failed to write page {item[0]}: {e}")
+
+
+def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event, lossless=False,
+                compress_level=PNG_COMPRESS_LEVEL, scale=1.0, strict_verify=False):
     """Run the capture process."""
     if not GlobalState.relative_offset:
         log("ERROR: Next Button location not set!")
@@ -135,8 +418,8 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
         return
 
     # Setup Hotkeys
-    def _stop():
-        log("Kill Switch (F10) detected!")
+    def _stop(source="Kill Switch (F10)"):
+        log(f"{source} detected!")
         stop_event.set()
         
     def _toggle_pause():
@@ -144,25 +427,51 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
         state = "PAUSED" if GlobalState.paused else "RESUMED"
         log(f"Capture {state} via F9")
 
+    hotkeys = []
+    for key, callback, args in (('f10', _stop, ()),
+                                ('q', _stop, ("Stop key (q)",)),  # Keeping 'q' as backup
+                                ('f9', _toggle_pause, ())):
+        try:
+            keyboard.add_hotkey(key, callback, args=args)
+            hotkeys.append(key)
+        except Exception as e:
+            log(f"Warning: Could not register global hotkey '{key}': {e}")
+
+    # Every exit below must unregister the hotkeys and re-enable the UI
     try:
-        keyboard.add_hotkey('f10', _stop)
-        keyboard.add_hotkey('f9', _toggle_pause)
-    except Exception as e:
-        log(f"Warning: Could not register global hotkeys: {e}")
+        _capture_book(total_pages, delay_ms, log, progress_cb, stop_event, lossless, compress_level, scale,
+                      strict_verify)
+    finally:
+        for key in hotkeys:
+            try:
+                keyboard.remove_hotkey(key)
+            except Exception:
+                pass
+        done_cb()
+
 
-    captured_files = []
+def _capture_book(total_pages, delay_ms, log, progress_cb, stop_event, lossless, compress_level, scale,
+                  strict_verify):
+    """Body of run_capture, run while the global hotkeys are registered."""
+    resumed = {}  # page number -> (path, width, height) of pages already on disk
+    pdf = new_pdf()
+    page_ext = ".png" if lossless else ".jpg"
     
     # Create temp directory
     if not TEMP_IMAGE_DIR.exists():
         TEMP_IMAGE_DIR.mkdir()
+    manifest = load_manifest()
     
     # Check for existing captures
-    existing = sorted(TEMP_IMAGE_DIR.glob("page_*.png"))
+    if strict_verify:
+        log("Fully checking existing pages...")
+    existing = load_existing_pages(manifest, strict=strict_verify)
     if existing:
-        valid = [f for f in existing if is_valid_image(f)]
-        if valid:
-            log(f"Found {len(valid)} existing pages. Resuming...")
-            captured_files = list(valid)
+        log(f"Found {len(existing)} existing pages. Resuming...")
+        if any(path.suffix != page_ext for path, _, _ in existing):
+            log("Note: some existing pages use the other format (lossless mode changed); keeping them.")
+        for path, width, height in existing:
+            resumed[int(path.stem[len("page_"):])] = (path, width, height)
     
     # Find VitalSource window
     log("Looking for VitalSource Bookshelf window...")
@@ -173,7 +482,6 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
         log("ERROR: VitalSource Bookshelf window not found!")
         log("Please open VitalSource Bookshelf and your book.")
         log("=" * 50)
-        done_cb()
         return
     
     log(f"Found window: {window.title}")
@@ -193,22 +501,39 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
     time.sleep(3)
     
     if stop_event.is_set():
-        done_cb()
         return
     
     delay_sec = delay_ms / 1000.0
     start_time = time.time()
-    start_page = len(captured_files) + 1
+    start_page = len(resumed) + 1
     
     log(f"Capturing from page {start_page}...")
     
+    # Encoding and writing run on their own threads so they overlap with the
+    # next grab, click and delay. Only this loop touches the screen.
+    encode_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    write_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    workers = [
+        threading.Thread(target=encode_worker, args=(encode_q, write_q, lossless, compress_level, scale, log), daemon=True),
+        threading.Thread(target=write_worker, args=(write_q, pdf, manifest, log), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+    
+    # Resumed pages join the PDF through the writer, each at its own page number
+    def _add_resumed(num):
+        path, width, height = resumed.pop(num)
+        encode_q.put((num, path, None, (width, height)))
+    
+    for num in sorted(n for n in resumed if n < start_page):
+        _add_resumed(num)
+    
+    last_capture = None  # (image, dHash) of the previous capture
+    repeats = 0  # Consecutive captures identical to the one before
+    held = []  # Repeated captures, only kept if the book turns out not to have ended
+    end_of_book = False
     page_num = start_page - 1
     while not stop_event.is_set():
-        if keyboard.is_pressed('q'): # Keeping 'q' as backup
-            log("Stop key (q) detected!")
-            stop_event.set()
-            break
-            
         if GlobalState.paused:
             time.sleep(0.5)
             continue
@@ -218,59 +543,104 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
         if total_pages and page_num > total_pages:
             break
         
-        screenshot_path = TEMP_IMAGE_DIR / f"page_{page_num:04d}.png"
-        
-        # Skip existing
-        if screenshot_path.exists() and screenshot_path in captured_files:
-            click_next_page(window)
-            time.sleep(delay_sec)
-            continue
+        screenshot_path = TEMP_IMAGE_DIR / f"page_{page_num:04d}{page_ext}"
         
-        # Re-find window in case it moved
-        window = find_vitalsource_window()
-        if window is None:
-            log("Window lost! Waiting...")
-            time.sleep(2)
+        # Reuse the cached window; only re-find it once the handle has gone stale.
+        # The rect is read once per page so a moved window is still followed.
+        rect = window_rect(window) if window is not None else None
+        if rect is None:
             window = find_vitalsource_window()
             if window is None:
+                log("Window lost! Waiting...")
+                time.sleep(2)
+                window = find_vitalsource_window()
+            rect = window_rect(window) if window is not None else None
+            if rect is None:
                 log("Window still not found. Stopping.")
                 break
         
+        # Skip existing
+        if page_num in resumed:
+            for item in held:
+                encode_q.put(item)
+            held.clear()
+            _add_resumed(page_num)
+            click_next_page(rect)
+            time.sleep(delay_sec)
+            continue
+        
         # Capture
-        if capture_window(window, screenshot_path):
-            captured_files.append(screenshot_path)
+        screenshot = capture_window(rect)
+        if screenshot is None:
+            log(f"Failed to capture page {page_num}")
+            window = None  # Force a re-find next page
+        else:
+            # The dHash only pre-filters; a repeat must match pixel for pixel
+            digest = page_hash(screenshot)
+            repeated = (last_capture is not None and last_capture[1] == digest
+                        and same_pixels(last_capture[0], screenshot))
+            last_capture = (screenshot, digest)
+            repeats = repeats + 1 if repeated else 0
             
-            # Progress
-            elapsed = time.time() - start_time
-            pages_done = page_num - start_page + 1
-            rate = pages_done / elapsed if elapsed > 0 else 0
+            if not total_pages and repeats >= END_OF_BOOK_REPEATS - 1:
+                log("End of book detected (page stopped changing).")
+                end_of_book = True
+                break
             
-            if total_pages:
-                pct = int(page_num / total_pages * 100)
-                remaining = (total_pages - page_num) / rate if rate > 0 else 0
-                mins, secs = divmod(int(remaining), 60)
-                log(f"Page {page_num}/{total_pages}  ({rate:.1f} p/s, ~{mins}m{secs:02d}s left)")
-                progress_cb(pct)
+            if repeated:
+                log(f"Page {page_num} is identical to the previous page")
+                held.append((page_num, screenshot_path, screenshot, None))
             else:
-                log(f"Page {page_num} captured  ({rate:.1f} p/s)")
-                progress_cb(-1)
-        else:
-            log(f"Failed to capture page {page_num}")
+                for item in held:
+                    encode_q.put(item)
+                held.clear()
+                encode_q.put((page_num, screenshot_path, screenshot, None))
+                
+                # Progress
+                elapsed = time.time() - start_time
+                pages_done = page_num - start_page + 1
+                rate = pages_done / elapsed if elapsed > 0 else 0
+                
+                if total_pages:
+                    pct = int(page_num / total_pages * 100)
+                    remaining = (total_pages - page_num) / rate if rate > 0 else 0
+                    mins, secs = divmod(int(remaining), 60)
+                    log(f"Page {page_num}/{total_pages}  ({rate:.1f} p/s, ~{mins}m{secs:02d}s left)")
+                    progress_cb(pct)
+                else:
+                    log(f"Page {page_num} captured  ({rate:.1f} p/s)")
+                    progress_cb(-1)
         
         # Next page
-        click_next_page(window)
+        if not click_next_page(rect) and not GlobalState.paused:
+            window = None  # Force a re-find next page
         time.sleep(delay_sec)
     
+    # Repeats held at the end are only dropped when they marked the end of the book
+    if not end_of_book:
+        for item in held:
+            encode_q.put(item)
+    
+    # Resumed pages beyond the last page reached still belong at the end
+    for num in sorted(resumed):
+        _add_resumed(num)
+    
+    # Let the encode/write stages finish the pages already captured
+    encode_q.put(None)
+    for worker in workers:
+        worker.join()
+    
     # Create PDF
     if stop_event.is_set():
         log("Capture stopped.")
     
-    all_files = sorted(TEMP_IMAGE_DIR.glob("page_*.png"))
-    valid_files = [f for f in all_files if is_valid_image(f)]
+    save_manifest(manifest)
     
-    if valid_files:
+    if pdf.page_no() > 0:
         pdf_path = SCRIPT_DIR / "converted_book.pdf"
-        create_pdf_from_images(valid_files, pdf_path, log)
+        log(f"Writing {pdf.page_no()} pages to PDF...")
+        pdf.output(str(pdf_path))
+        log(f"PDF created: {pdf_path}")
         
         # Cleanup
         if not stop_event.is_set(): # Only cleanup if finished fully
@@ -279,25 +649,26 @@ def run_capture(total_pages, delay_ms, log, progress_cb, done_cb, stop_event):
             shutil.rmtree(TEMP_IMAGE_DIR)
     
     log("Done!")
-    keyboard.remove_hotkey('f10')
-    keyboard.remove_hotkey('f9')
     progress_cb(100)
-    done_cb()
 
 
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("VitalSource Desktop Capture v2")
-        self.geometry("600x580")
+        self.geometry("600x700")
         self.resizable(False, False)
         self.configure(bg="#1e1e2e")
         
         self.stop_event = threading.Event()
         self.worker_thread = None
+        # Filled from worker threads, drained on the Tk thread by _drain_log
+        self._log_q = queue.Queue()
+        self._progress_q = queue.Queue()
         
         self._build_ui()
         self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(LOG_DRAIN_MS, self._drain_log)
     
     def _build_ui(self):
         style = ttk.Style(self)
@@ -311,6 +682,8 @@ class App(tk.Tk):
         style.configure("TLabel", background=bg, foreground=fg, font=("Segoe UI", 10))
         style.configure("Header.TLabel", background=bg, foreground=accent, font=("Segoe UI", 16, "bold"))
         style.configure("TEntry", fieldbackground=entry_bg, foreground=fg, font=("Segoe UI", 10))
+        style.configure("TCheckbutton", background=bg, foreground=fg, font=("Segoe UI", 10))
+        style.map("TCheckbutton", background=[("active", bg)])
         style.configure("TButton", background="#45475a", foreground=fg, font=("Segoe UI", 10, "bold"))
         style.configure("Accent.TButton", background=accent, foreground="#1e1e2e", font=("Segoe UI", 11, "bold"))
         style.configure("Stop.TButton", background="#f38ba8", foreground="#1e1e2e", font=("Segoe UI", 11, "bold"))
@@ -352,6 +725,26 @@ class App(tk.Tk):
         self.delay_entry.insert(0, "500")
         self.delay_entry.grid(row=1, column=1, padx=(8, 0), pady=4, sticky="w")
         
+        ttk.Label(form, text="PNG Level (0-9):", style="TLabel").grid(row=2, column=0, sticky="w", pady=4)
+        self.level_entry = ttk.Entry(form, width=20, style="TEntry")
+        self.level_entry.insert(0, str(PNG_COMPRESS_LEVEL))
+        self.level_entry.grid(row=2, column=1, padx=(8, 0), pady=4, sticky="w")
+        ttk.Label(form, text="(lossless mode; higher = smaller, slower)", style="TLabel").grid(row=2, column=2, padx=(8, 0))
+        
+        ttk.Label(form, text="Scale:", style="TLabel").grid(row=3, column=0, sticky="w", pady=4)
+        self.scale_entry = ttk.Entry(form, width=20, style="TEntry")
+        self.scale_entry.insert(0, "1.0")
+        self.scale_entry.grid(row=3, column=1, padx=(8, 0), pady=4, sticky="w")
+        ttk.Label(form, text="(e.g. 0.75 for smaller, faster pages)", style="TLabel").grid(row=3, column=2, padx=(8, 0))
+        
+        self.lossless_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(form, text="Lossless mode (PNG instead of JPEG)", variable=self.lossless_var,
+                        style="TCheckbutton").grid(row=4, column=0, columnspan=3, sticky="w", pady=4)
+        
+        self.strict_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(form, text="Full check of existing pages on resume (slower)", variable=self.strict_var,
+                        style="TCheckbutton").grid(row=5, column=0, columnspan=3, sticky="w", pady=4)
+        
         # Buttons
         btn_frame = tk.Frame(self, bg=bg)
         btn_frame.pack(pady=12)
@@ -359,7 +752,7 @@ class App(tk.Tk):
         self.start_btn = ttk.Button(btn_frame, text="Start Capture", style="Accent.TButton", command=self._on_start)
         self.start_btn.pack(side="left", padx=6, ipadx=12, ipady=4)
         
-        self.stop_btn = ttk.Button(btn_frame, text="Stop (Hold 'q')", style="Stop.TButton", command=self._on_stop, state="disabled")
+        self.stop_btn = ttk.Button(btn_frame, text="Stop (q / F10)", style="Stop.TButton", command=self._on_stop, state="disabled")
         self.stop_btn.pack(side="left", padx=6, ipadx=12, ipady=4)
         
         # Progress
@@ -374,15 +767,32 @@ class App(tk.Tk):
         self.log_area.pack(padx=24, pady=(0, 16), fill="both", expand=True)
     
     def _log(self, msg):
-        def _append():
+        self._log_q.put(msg)
+    
+    def _set_progress(self, value):
+        self._progress_q.put(value)
+    
+    def _drain_log(self):
+        lines = []
+        try:
+            while len(lines) < LOG_DRAIN_BATCH:
+                lines.append(self._log_q.get_nowait())
+        except queue.Empty:
+            pass
+        if lines:
             self.log_area.configure(state="normal")
-            self.log_area.insert("end", msg + "\n")
+            self.log_area.insert("end", "\n".join(lines) + "\n")
             self.log_area.see("end")
             self.log_area.configure(state="disabled")
-        self.after(0, _append)
-    
-    def _set_progress(self, value):
-        def _update():
+        
+        # Coalesce progress updates: only the latest value is shown
+        value = None
+        try:
+            while True:
+                value = self._progress_q.get_nowait()
+        except queue.Empty:
+            pass
+        if value is not None:
             if value < 0:
                 self.progress.configure(mode="indeterminate")
                 self.progress.start(15)
@@ -390,7 +800,8 @@ class App(tk.Tk):
                 self.progress.stop()
                 self.progress.configure(mode="determinate")
                 self.progress["value"] = value
-        self.after(0, _update)
+        
+        self.after(LOG_DRAIN_MS, self._drain_log)
     
     def _on_done(self):
         def _finish():
@@ -407,38 +818,36 @@ class App(tk.Tk):
                             "2. Press the 'n' key on your keyboard to save the location.")
         
         self.set_btn.configure(text="Waiting for 'n' key...", state="disabled")
-        self.update()
         
-        # Wait for key press
-        while True:
-            if keyboard.is_pressed('n'):
-                mx, my = pyautogui.position()
+        # Block on the key in a helper thread and hand the position back to Tk
+        def _wait():
+            keyboard.wait('n')
+            mx, my = pyautogui.position()
+            self.after(0, self._finish_set_button, mx, my)
+        
+        threading.Thread(target=_wait, daemon=True).start()
+    
+    def _finish_set_button(self, mx, my):
+        # Get the window to calculate relative offset
+        try:
+            import pygetwindow as gw
+            # We try to find the window right now
+            win = find_vitalsource_window()
+            
+            if win:
+                off_x = mx - win.left
+                off_y = my - win.top
+                GlobalState.relative_offset = (off_x, off_y)
+                self.coord_label.configure(text=f"Offset: ({off_x}, {off_y})", foreground="#a6e3a1")
+                self.set_btn.configure(text="Set Next Button Location", state="normal")
+                messagebox.showinfo("Success", f"Location set relative to window.\nOffset: ({off_x}, {off_y})")
+            else:
+                messagebox.showerror("Error", "VitalSource window not found! Is it open?")
+                self.set_btn.configure(text="Set Next Button Location", state="normal")
                 
-                # Get the window to calculate relative offset
-                try:
-                    import pygetwindow as gw
-                    # We try to find the window right now
-                    win = find_vitalsource_window()
-                    
-                    if win:
-                        off_x = mx - win.left
-                        off_y = my - win.top
-                        GlobalState.relative_offset = (off_x, off_y)
-                        self.coord_label.configure(text=f"Offset: ({off_x}, {off_y})", foreground="#a6e3a1")
-                        self.set_btn.configure(text="Set Next Button Location", state="normal")
-                        messagebox.showinfo("Success", f"Location set relative to window.\nOffset: ({off_x}, {off_y})")
-                    else:
-                        messagebox.showerror("Error", "VitalSource window not found! Is it open?")
-                        self.set_btn.configure(text="Set Next Button Location", state="normal")
-                        
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to calculate offset: {e}")
-                    self.set_btn.configure(text="Set Next Button Location", state="normal")
-
-                time.sleep(0.5) # Debounce
-                break
-            self.update()
-            time.sleep(0.05)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to calculate offset: {e}")
+            self.set_btn.configure(text="Set Next Button Location", state="normal")
     
     def _on_start(self):
         if not GlobalState.relative_offset:
@@ -447,6 +856,8 @@ class App(tk.Tk):
 
         pages_text = self.pages_entry.get().strip()
         delay_text = self.delay_entry.get().strip()
+        level_text = self.level_entry.get().strip()
+        scale_text = self.scale_entry.get().strip()
         
         total_pages = None
         if pages_text:
@@ -464,6 +875,24 @@ class App(tk.Tk):
                 messagebox.showwarning("Invalid", "Delay must be at least 100ms")
                 return
         
+        compress_level = PNG_COMPRESS_LEVEL
+        if level_text:
+            if level_text.isdigit() and int(level_text) <= 9:
+                compress_level = int(level_text)
+            else:
+                messagebox.showwarning("Invalid", "PNG level must be between 0 and 9")
+                return
+        
+        scale = 1.0
+        if scale_text:
+            try:
+                scale = float(scale_text)
+            except ValueError:
+                scale = 0
+            if not 0 < scale <= 1:
+                messagebox.showwarning("Invalid", "Scale must be between 0 and 1")
+                return
+        
         # Clear log
         self.log_area.configure(state="normal")
         self.log_area.delete("1.0", "end")
@@ -477,6 +906,8 @@ class App(tk.Tk):
         self.worker_thread = threading.Thread(
             target=run_capture,
             args=(total_pages, delay_ms, self._log, self._set_progress, self._on_done, self.stop_event),
+            kwargs={"lossless": self.lossless_var.get(), "compress_level": compress_level, "scale": scale,
+                    "strict_verify": self.strict_var.get()},
             daemon=True
         )
         self.worker_thread.start()